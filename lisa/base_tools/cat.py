@@ -1,10 +1,15 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import shlex
+from typing import Dict, List
 
 from lisa.executable import Tool
 
 
 class Cat(Tool):
+    # separates the content of files, when multiple files are read in one command.
+    __file_marker = "==lisa file=="
+
     @property
     def command(self) -> str:
         return "cat"
@@ -36,3 +41,33 @@ class Cat(Tool):
         result = self.run(params, force_run=force_run, sudo=sudo, shell=True)
         result.assert_exit_code(message=f"Error : {result.stdout}")
         return result.stdout
+
+    def read_multiple(
+        self,
+        files: List[str],
+        sudo: bool = False,
+    ) -> Dict[str, str]:
+        """
+        Read small files in one command, so it needs only one round trip to the node.
+        The returned dict is keyed by file path, and files which don't exist are not
+        in it. It fails, if any existing file cannot be read.
+        """
+        file_list = " ".join(shlex.quote(file) for file in files)
+        # echo after cat, in case a file doesn't end with a new line. Missing files
+        # are skipped, and the exit code is not 0 if any existing file fails.
+        result = self.node.execute(
+            f'rc=0; for f in {file_list}; do if [ -e "$f" ]; then '
+            f'echo "{self.__file_marker}$f" && {self.command} "$f" && echo || rc=1; '
+            "fi; done; exit $rc",
+            shell=True,
+            sudo=sudo,
+        )
+        result.assert_exit_code(message=f"Error : {result.stderr}")
+        contents: Dict[str, List[str]] = {}
+        lines: List[str] = []
+        for line in result.stdout.splitlines():
+            if line.startswith(self.__file_marker):
+                lines = contents.setdefault(line[len(self.__file_marker) :], [])
+            else:
+                lines.append(line)
+        return {file: "\n".join(lines).strip() for file, lines in contents.items()}
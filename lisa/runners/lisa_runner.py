@@ -625,8 +625,11 @@ class LisaRunner(BaseRunner):
                         node_requirement_data: Dict[
                             str, Any
                         ] = node_requirement.to_dict()  # type: ignore
+                        # the data is generated above, so update it in place.
                         node_requirement_data = deep_update_dict(
-                            platform_requirement_data, node_requirement_data
+                            platform_requirement_data,
+                            node_requirement_data,
+                            copy=False,
                         )
                         node_requirement = schema.load_by_type(
                             schema.NodeSpace, node_requirement_data
@@ -2,7 +2,7 @@
 # Licensed under the MIT license.
 
 import re
-from typing import List
+from typing import Any, List
 
 from semver import VersionInfo
 
@@ -30,6 +30,10 @@ class Dmesg(Tool):
     def command(self) -> str:
         return "dmesg"
 
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        # if dmesg needs sudo, it doesn't try without sudo again.
+        self._need_sudo = False
+
     def _check_exists(self) -> bool:
         return True
 
@@ -83,11 +87,13 @@ class Dmesg(Tool):
         raise LisaException("No find matched vmbus version in dmesg")
 
     def _run(self, force_run: bool = False) -> ExecutableResult:
+        if self._need_sudo:
+            return self.run(force_run=force_run, sudo=True)
         # sometime it need sudo, we can retry
         # so no_error_log for first time
         result = self.run(force_run=force_run, no_error_log=True)
         if result.exit_code != 0:
             # may need sudo
-            result = self.run(sudo=True)
-        self._cached_result = result
+            self._need_sudo = True
+            result = self.run(force_run=force_run, sudo=True)
         return result
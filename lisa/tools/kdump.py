@@ -2,8 +2,9 @@
 # Licensed under the MIT license.
 
 import re
+from functools import cached_property
 from pathlib import PurePath, PurePosixPath
-from typing import TYPE_CHECKING, List, Type
+from typing import TYPE_CHECKING, Dict, List, Type
 
 from retry import retry
 from semver import VersionInfo
@@ -21,6 +22,13 @@ from lisa.util import LisaException, UnsupportedDistroException
 if TYPE_CHECKING:
     from lisa.node import Node
 
+# Regular expressions are compiled once here when the module is imported. Add new
+# patterns here, instead of compiling them in methods.
+
+# kexec-tools 2.0.16
+# the "kexec" prefix is checked before matching, so only the numbers are matched.
+_kexec_version_pattern = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
 
 class Kexec(Tool):
     """
@@ -35,11 +43,6 @@ class Kexec(Tool):
     This tool is used for managing the installation of kexec.
     """
 
-    # kexec-tools 2.0.16
-    __pattern_kexec_version_info = re.compile(
-        r"^kexec\S+\s+(?P<major>\d+).(?P<minor>\d+).(?P<patch>\d+)"
-    )
-
     # Existed bug for kexec-tools 2.0.14
     # https://bugs.launchpad.net/ubuntu/+source/kexec-tools/+bug/1713940
     # If the version of kexec-tools is lower than 2.0.15, we install kexec from source
@@ -47,9 +50,10 @@ class Kexec(Tool):
 
     # If install kexec from source, we choose 2.0.18 version for it is stable for most
     # Debian distros
+    _kexec_source_folder = "kexec-tools-2.0.18"
     _kexec_repo = (
         "https://mirrors.edge.kernel.org/pub/linux/utils/kernel/kexec/"
-        "kexec-tools-2.0.18.tar.gz"
+        f"{_kexec_source_folder}.tar.gz"
     )
 
     @property
@@ -61,6 +65,8 @@ class Kexec(Tool):
         return True
 
     def _install(self) -> bool:
+        # It's called only if kexec is not found on the node, so an installed kexec
+        # skips both the package installation and the build from source.
         assert isinstance(self.node.os, Posix)
         self.node.os.install_packages("kexec-tools")
         if isinstance(self.node.os, Debian):
@@ -79,25 +85,30 @@ class Kexec(Tool):
             shell=False,
         )
         result.assert_exit_code(message=result.stderr)
-        raw_version = re.finditer(self.__pattern_kexec_version_info, result.stdout)
-        for version in raw_version:
-            matched_version = self.__pattern_kexec_version_info.match(version.group())
-            if matched_version:
-                major = matched_version.group("major")
-                minor = matched_version.group("minor")
-                patch = matched_version.group("patch")
-                self._log.info(f"kexec version is {major}.{minor}.{patch}")
-                return VersionInfo(int(major), int(minor), int(patch))
-        raise LisaException("No find matched kexec version")
+        # the version is in the first line of output
+        first_line = result.stdout.split("\n", 1)[0]
+        matched_version = None
+        if first_line.startswith("kexec"):
+            matched_version = _kexec_version_pattern.search(first_line)
+        if not matched_version:
+            raise LisaException("No find matched kexec version")
+        major, minor, patch = map(int, matched_version.groups())
+        self._log.info(f"kexec version is {major}.{minor}.{patch}")
+        return VersionInfo(major, minor, patch)
 
     def _install_from_src(self) -> None:
         tool_path = self.get_tool_path()
         wget = self.node.tools[Wget]
-        kexec_tar = wget.get(self._kexec_repo, str(tool_path))
         tar = self.node.tools[Tar]
-        tar.extract(kexec_tar, str(tool_path))
-        kexec_source = tar.get_root_folder(kexec_tar)
-        code_path = tool_path.joinpath(kexec_source)
+        # stream the download into tar, so the tarball isn't saved and read again.
+        self.node.execute(
+            f"{wget.command} -qO- '{self._kexec_repo}' | "
+            f"{tar.command} -xzf - -C {tool_path}",
+            shell=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to download kexec source",
+        )
+        code_path = tool_path.joinpath(self._kexec_source_folder)
         self.node.tools[Gcc]
         make = self.node.tools[Make]
         self.node.execute("./configure", cwd=code_path).assert_exit_code()
@@ -186,6 +197,23 @@ class KdumpBase(Tool):
     def dependencies(self) -> List[Type[Tool]]:
         return [Kexec, Makedumpfile]
 
+    # tools used by kdump are looked up once, and reused in later calls.
+    @cached_property
+    def _cat(self) -> Cat:
+        return self.node.tools[Cat]
+
+    @cached_property
+    def _sed(self) -> Sed:
+        return self.node.tools[Sed]
+
+    @cached_property
+    def _service(self) -> Service:
+        return self.node.tools[Service]
+
+    @cached_property
+    def _sysctl(self) -> Sysctl:
+        return self.node.tools[Sysctl]
+
     @property
     def command(self) -> str:
         raise NotImplementedError()
@@ -198,12 +226,15 @@ class KdumpBase(Tool):
         raise NotImplementedError()
 
     def check_required_kernel_config(self, config_path: str) -> None:
+        # find all required configs in one pass of the config file.
+        configs = "|".join(self.required_kernel_config)
+        result = self.node.execute(f"grep -Eo '^({configs})=y$' {config_path}")
+        enabled_configs = {line.split("=")[0] for line in result.stdout.splitlines()}
         for config in self.required_kernel_config:
-            result = self.node.execute(f"grep {config}=y {config_path}")
-            result.assert_exit_code(
-                message=f"The kernel config {config} is not set."
-                "Kdump is not supported."
-            )
+            if config not in enabled_configs:
+                raise LisaException(
+                    f"The kernel config {config} is not set. Kdump is not supported."
+                )
 
     def _get_crashkernel_cfg_file(self) -> str:
         """
@@ -232,28 +263,26 @@ class KdumpBase(Tool):
                 f"{cfg_file} doesn't exist. Please check the right grub file for "
                 f"{self.node.os.name} {self.node.os.information.version}."
             )
-            cat = self.node.tools[Cat]
-            sed = self.node.tools[Sed]
-            result = cat.run(cfg_file)
-            if "crashkernel" in result.stdout:
-                sed.substitute(
-                    match_lines="^GRUB_CMDLINE_LINUX",
-                    regexp='crashkernel=[^[:space:]"]*',
-                    replacement=f"crashkernel={crashkernel}",
-                    file=cfg_file,
-                    sudo=True,
-                )
-            else:
-                sed.substitute(
-                    match_lines="^GRUB_CMDLINE_LINUX",
-                    regexp='"$',
-                    replacement=f" crashkernel={crashkernel}",
-                    file=cfg_file,
-                    sudo=True,
-                )
-            # Check if crashkernel is insert in cfg file
-            result = cat.run(cfg_file, force_run=True)
-            if f"crashkernel={crashkernel}" not in result.stdout:
+            # Replace the existing crashkernel, or append it to the end of kernel
+            # command line. Then check if crashkernel is inserted. It's done in one
+            # command, so it needs only one round trip to the node.
+            match_lines = "^GRUB_CMDLINE_LINUX"
+            substitute_cmd = (
+                f"sed -i.bak '/{match_lines}/s/crashkernel=[^[:space:]\"]*/"
+                f"crashkernel={crashkernel}/g' {cfg_file}"
+            )
+            append_cmd = (
+                f"sed -i.bak '/{match_lines}/s/\"$/ crashkernel={crashkernel}\"/g' "
+                f"{cfg_file}"
+            )
+            result = self.node.execute(
+                f"if grep -q crashkernel {cfg_file}; then {substitute_cmd}; "
+                f"else {append_cmd}; fi && "
+                f"grep -qF 'crashkernel={crashkernel}' {cfg_file}",
+                shell=True,
+                sudo=True,
+            )
+            if result.exit_code != 0:
                 raise LisaException(
                     f'No find "crasherkel={crashkernel}" in {cfg_file} after'
                     "insert. Please double check the grub config file and insert"
@@ -278,8 +307,7 @@ class KdumpBase(Tool):
         This method enable the kdump service. If distro has a different kdump service
         name, need override it.
         """
-        service = self.node.tools[Service]
-        service.enable_service("kdump")
+        self._service.enable_service("kdump")
 
     def set_unknown_nmi_panic(self) -> None:
         """
@@ -292,53 +320,68 @@ class KdumpBase(Tool):
         """
         nmi_panic_file = PurePath("/proc/sys/kernel/unknown_nmi_panic")
         if self.node.shell.exists(nmi_panic_file):
-            sysctl = self.node.tools[Sysctl]
-            sysctl.write("kernel.unknown_nmi_panic", "1")
+            self._sysctl.write("kernel.unknown_nmi_panic", "1")
 
-    @retry(exceptions=LisaException, tries=60, delay=1)  # type: ignore
+    @retry(  # type: ignore
+        exceptions=LisaException, tries=35, delay=0.1, backoff=1.5, max_delay=2
+    )
     def _check_kexec_crash_loaded(self) -> None:
         """
-        Sometimes it costs a while to load the value, so define this methed as @retry
+        Sometimes it costs a while to load the value, so define this methed as @retry.
+        The value is usually loaded soon, so it retries fast at first, and backs off
+        to wait about 60 seconds in total.
         """
-        cat = self.node.tools[Cat]
-        result = cat.run(self.kexec_crash, force_run=True)
-        if "1" != result.stdout:
+        if "1" != self._read_file(self.kexec_crash):
             raise LisaException(f"{self.kexec_crash} file's value is not 1.")
 
-    def _check_crashkernel_in_cmdline(self, crashkernel_memory: str) -> None:
-        cat = self.node.tools[Cat]
-        result = cat.run("/proc/cmdline", force_run=True)
-        if f"crashkernel={crashkernel_memory}" not in result.stdout:
+    def _check_crashkernel_in_cmdline(
+        self, crashkernel_memory: str, cmdline: str
+    ) -> None:
+        if f"crashkernel={crashkernel_memory}" not in cmdline:
             raise LisaException(
                 f"crashkernel={crashkernel_memory} boot parameter is not present in"
                 "kernel cmdline"
             )
 
-    def _check_crashkernel_memory_reserved(self) -> None:
-        cat = self.node.tools[Cat]
-        result = cat.run(self.iomem, force_run=True)
-        if "Crash kernel" not in result.stdout:
+    def _check_crashkernel_memory_reserved(self, iomem: str) -> None:
+        if "Crash kernel" not in iomem:
             raise LisaException(
                 f"No find 'Crash kernel' in {self.iomem}. Memory isn't reserved for"
                 "crash kernel"
             )
 
+    def _read_files(self, files: List[str]) -> Dict[str, str]:
+        return self._cat.read_multiple(files)
+
+    def _read_file(self, file: str) -> str:
+        contents = self._read_files([file])
+        if file not in contents:
+            raise LisaException(f"{file} doesn't exist.")
+        return contents[file]
+
     def check_crashkernel_loaded(self, crashkernel_memory: str) -> None:
+        contents = self._read_files(["/proc/cmdline", self.kexec_crash, self.iomem])
+
         # Check crashkernel parameter in cmdline
-        self._check_crashkernel_in_cmdline(crashkernel_memory)
+        self._check_crashkernel_in_cmdline(
+            crashkernel_memory, contents.get("/proc/cmdline", "")
+        )
 
         # Check crash kernel loaded
-        if not self.node.shell.exists(PurePosixPath(self.kexec_crash)):
+        if self.kexec_crash not in contents:
             raise LisaException(
                 f"{self.kexec_crash} file doesn't exist. Kexec crash is not loaded."
             )
-        self._check_kexec_crash_loaded()
+        if contents[self.kexec_crash] != "1":
+            # the value may not be loaded yet, wait for it.
+            self._check_kexec_crash_loaded()
 
         # Check if memory is reserved for crash kernel
-        self._check_crashkernel_memory_reserved()
+        self._check_crashkernel_memory_reserved(contents.get(self.iomem, ""))
 
     def check_vmcore_exist(self) -> None:
-        cmd = f"find {self.dump_path} -type f -size +10M"
+        # stop on the first found file, it's enough to know the dump file exists.
+        cmd = f"find {self.dump_path} -type f -size +10M -print -quit"
         result = self.node.execute(cmd, shell=True, sudo=True)
         if result.stdout == "":
             raise LisaException(
@@ -354,7 +397,10 @@ class KdumpRedhat(KdumpBase):
 
     def _install(self) -> bool:
         assert isinstance(self.node.os, Redhat)
-        self.node.os.install_packages("kexec-tools")
+        # kdumpctl is in kexec-tools, which is installed already by the dependent
+        # Kexec tool in most cases. So check it again before installing.
+        if not self._check_exists():
+            self.node.os.install_packages("kexec-tools")
         return self._check_exists()
 
     def _get_crashkernel_cfg_file(self) -> str:
@@ -382,27 +428,35 @@ class KdumpRedhat(KdumpBase):
         maybe not enough to store the dump file, need change the dump path
         """
         kdump_conf = "/etc/kdump.conf"
-        check_memory_cmd = "free -h | grep Mem | awk '{print $2}'"
-        result = self.node.execute(check_memory_cmd, shell=True, sudo=True)
-        if "Ti" not in result.stdout:
-            # System memeory size is smaller than 1T, no need to change dump path
-            return
-        size = float(result.stdout.strip("Ti"))
-        if size > 1:
+        if self._get_memory_size() > 1 << 40:
             self.dump_path = "/mnt/crash"
             self.node.execute(
                 f"mkdir -p {self.dump_path}", shell=True, sudo=True
             ).assert_exit_code()
             # Change dump path in kdump conf
-            sed = self.node.tools[Sed]
-            sed.substitute(
+            self._sed.substitute(
                 match_lines="^path",
                 regexp="path",
                 replacement="#path",
                 file=kdump_conf,
                 sudo=True,
             )
-            sed.append(f"path {self.dump_path}", kdump_conf, sudo=True)
+            self._sed.append(f"path {self.dump_path}", kdump_conf, sudo=True)
+
+    def _get_memory_size(self) -> int:
+        """
+        Return the system memory size in bytes. The memory size doesn't change, so
+        use the node capability if it has an exact value, to save a command.
+        """
+        memory_mb = self.node.capability.memory_mb
+        if isinstance(memory_mb, int) and memory_mb > 0:
+            return memory_mb * 1024 * 1024
+
+        # get total memory in bytes, so it doesn't depend on the units of "free -h"
+        check_memory_cmd = "free -b | awk '/^Mem:/ {print $2}'"
+        result = self.node.execute(check_memory_cmd, shell=True, sudo=True)
+        result.assert_exit_code(message="Failed to get the system memory size")
+        return int(result.stdout.strip())
 
 
 class KdumpDebian(KdumpBase):
@@ -422,8 +476,7 @@ class KdumpDebian(KdumpBase):
         return "update-grub"
 
     def enable_kdump_service(self) -> None:
-        service = self.node.tools[Service]
-        service.enable_service("kdump-tools")
+        self._service.enable_service("kdump-tools")
 
 
 class KdumpSuse(KdumpBase):
@@ -67,7 +67,10 @@ class Lscpu(Tool):
     )
 
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        # parsed values are cached, they don't change unless force_run.
         self._core_count: Optional[int] = None
+        self._architecture: Optional[str] = None
+        self._cpu_type: Optional[CpuType] = None
 
     @property
     def command(self) -> str:
@@ -81,6 +84,8 @@ class Lscpu(Tool):
         return True
 
     def get_architecture(self, force_run: bool = False) -> str:
+        if self._architecture and not force_run:
+            return self._architecture
         architecture: str = ""
         result = self.run(force_run=force_run)
         matched = self.__architecture_pattern.findall(result.stdout)
@@ -94,9 +99,12 @@ class Lscpu(Tool):
             f"architecture {architecture} must be one of "
             f"{self.__valid_architecture_list}.",
         ).is_subset_of(self.__valid_architecture_list)
+        self._architecture = architecture
         return architecture
 
     def get_core_count(self, force_run: bool = False) -> int:
+        if self._core_count is not None and not force_run:
+            return self._core_count
         result = self.run(force_run=force_run)
         matched = self.__vcpu.findall(result.stdout)
         assert_that(
@@ -138,12 +146,14 @@ class Lscpu(Tool):
         return int(matched[0]) * 1
 
     def get_cpu_type(self, force_run: bool = False) -> CpuType:
+        if self._cpu_type and not force_run:
+            return self._cpu_type
         result = self.run(force_run=force_run)
         if "AuthenticAMD" in result.stdout:
-            return CpuType.AMD
-        elif "GenuineIntel" in result.stdout:
-            return CpuType.Intel
-        return CpuType.Intel
+            self._cpu_type = CpuType.AMD
+        else:
+            self._cpu_type = CpuType.Intel
+        return self._cpu_type
 
     def get_cpu_info(self) -> List[CPUInfo]:
         # `lscpu --extended=cpu,node,socket,cache` command return the
@@ -185,6 +195,8 @@ class WindowsLscpu(Lscpu):
         return "wmic cpu get"
 
     def get_core_count(self, force_run: bool = False) -> int:
+        if self._core_count is not None and not force_run:
+            return self._core_count
         result = self.run("ThreadCount", force_run=force_run)
         lines = result.stdout.splitlines(keepends=False)
         assert "ThreadCount" == lines[0].strip(), f"actual: '{lines[0]}'"
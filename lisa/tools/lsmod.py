@@ -2,10 +2,10 @@
 # Licensed under the MIT license.
 
 import re
-from typing import Any
+from typing import Any, Set
 
 from lisa.executable import Tool
-from lisa.util import LisaException, find_patterns_in_lines
+from lisa.util import LisaException, find_patterns_groups_in_lines
 
 
 class Lsmod(Tool):
@@ -35,6 +35,16 @@ class Lsmod(Tool):
         no_info_log: bool = True,
         no_error_log: bool = True,
     ) -> bool:
+        return mod_name in self.get_loaded_modules(
+            force_run=force_run, no_info_log=no_info_log, no_error_log=no_error_log
+        )
+
+    def get_loaded_modules(
+        self,
+        force_run: bool = False,
+        no_info_log: bool = True,
+        no_error_log: bool = True,
+    ) -> Set[str]:
         result = self.run(
             sudo=True,
             force_run=force_run,
@@ -46,8 +56,7 @@ class Lsmod(Tool):
                 f"{self._command} command got non-zero exit code: {result.exit_code}"
             )
 
-        module_info = find_patterns_in_lines(result.stdout, [self.__output_pattern])
-        if any(mod_name in info for sublist in module_info for info in sublist):
-            return True
-
-        return False
+        module_info = find_patterns_groups_in_lines(
+            result.stdout, [self.__output_pattern]
+        )
+        return {info["name"] for info in module_info[0]}
@@ -66,6 +66,7 @@ class Lspci(Tool):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         self._command = "lspci"
         self._pci_devices: List[PciDevice] = []
+        self._pci_ids_updated = False
 
     def _install(self) -> bool:
         if isinstance(self.node.os, Posix):
@@ -95,8 +96,11 @@ class Lspci(Tool):
     def get_device_list(self, force_run: bool = False) -> List[PciDevice]:
         if (not self._pci_devices) or force_run:
             self._pci_devices = []
-            # Ensure pci device ids and name mappings are updated.
-            self.node.execute("update-pciids", sudo=True)
+            # Ensure pci device ids and name mappings are updated. The mappings
+            # don't change when devices are added or removed, so update them once.
+            if not self._pci_ids_updated:
+                self.node.execute("update-pciids", sudo=True)
+                self._pci_ids_updated = True
             result = self.run(
                 "-m",
                 force_run=force_run,
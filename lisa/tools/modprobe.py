@@ -4,6 +4,8 @@ from typing import Any, List, Union
 
 from lisa.executable import Tool
 
+from .lsmod import Lsmod
+
 
 class Modprobe(Tool):
     @property
@@ -48,16 +50,20 @@ class Modprobe(Tool):
         self,
         mod_names: List[str],
     ) -> None:
-        for mod_name in mod_names:
-            if self.is_module_loaded(mod_name, force_run=True):
-                self.run(
-                    f"-r {mod_name}",
-                    force_run=True,
-                    sudo=True,
-                    expected_exit_code=0,
-                    expected_exit_code_failure_message="Fail to remove module"
-                    f" {mod_name}",
-                )
+        # check all modules with one lsmod, and remove loaded ones in order with
+        # one command. Nothing runs, if none of them is loaded.
+        loaded_modules = self.node.tools[Lsmod].get_loaded_modules(force_run=True)
+        mod_names = [x for x in mod_names if x.replace("-", "_") in loaded_modules]
+        if not mod_names:
+            return
+        mod_names_str = " ".join(mod_names)
+        self.run(
+            f"-r {mod_names_str}",
+            force_run=True,
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message=f"Fail to remove module {mod_names_str}",
+        )
 
     def load(
         self,
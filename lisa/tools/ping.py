@@ -20,6 +20,7 @@ class Ping(Tool):
         count: int = 5,
         interval: float = 0.2,
         package_size: Optional[int] = None,
+        deadline: Optional[int] = None,
     ) -> Process:
         if not target:
             target = INTERNET_PING_ADDRESS
@@ -28,6 +29,10 @@ class Ping(Tool):
             args += f" -I {nic_name}"
         if package_size:
             args += f" -s {package_size}"
+        if deadline:
+            # with a deadline, ping keeps sending until count replies are
+            # received, or the deadline is reached.
+            args += f" -w {deadline}"
 
         return self.run_async(args, force_run=True)
 
@@ -39,6 +44,7 @@ class Ping(Tool):
         interval: float = 0.2,
         package_size: Optional[int] = None,
         ignore_error: bool = False,
+        deadline: Optional[int] = None,
     ) -> bool:
         if not target:
             target = INTERNET_PING_ADDRESS
@@ -48,6 +54,7 @@ class Ping(Tool):
             count=count,
             interval=interval,
             package_size=package_size,
+            deadline=deadline,
         ).wait_result()
         if not ignore_error:
             result.assert_exit_code(
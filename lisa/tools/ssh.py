@@ -1,11 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import shlex
 
 from lisa.base_tools import Cat, Sed
 from lisa.executable import Tool
 from lisa.util import LisaException
 
-from .echo import Echo
 from .find import Find
 from .service import Service
 
@@ -37,11 +37,27 @@ class Ssh(Tool):
         )
         return public_key
 
+    def get_or_generate_key_pairs(self) -> str:
+        # reuse the key pairs, if they are generated already.
+        result = self.node.execute(
+            "test -f ~/.ssh/id_rsa && cat ~/.ssh/id_rsa.pub",
+            shell=True,
+            no_error_log=True,
+        )
+        if result.exit_code == 0 and result.stdout:
+            return result.stdout
+        return self.generate_key_pairs()
+
     def enable_public_key(self, public_key: str) -> None:
-        self.node.tools[Echo].write_to_file(
-            public_key,
-            self.node.get_pure_path("~/.ssh/authorized_keys"),
-            append=True,
+        # the key is appended only if it's not authorized yet, so the file
+        # doesn't grow on repeated calls.
+        key = shlex.quote(public_key.strip())
+        authorized_keys = self.node.get_pure_path("~/.ssh/authorized_keys")
+        self.node.execute(
+            f"grep -qxF {key} {authorized_keys} || echo {key} >> {authorized_keys}",
+            shell=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="error on enable public key.",
         )
 
     def get_sshd_config_path(self) -> str:
@@ -1,14 +1,104 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import ast
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Type
+from types import CodeType
+from typing import Any, Dict, List, Tuple, Type
 
 from dataclasses_json import dataclass_json
 
 from lisa import LisaException, schema
 from lisa.transformer import Transformer
 
+# builtins which can be used in scripts. Other builtins, like __import__ and open,
+# are not available.
+_SCRIPT_BUILTINS: Dict[str, Any] = {
+    "abs": abs,
+    "bool": bool,
+    "float": float,
+    "int": int,
+    "len": len,
+    "max": max,
+    "min": min,
+    "round": round,
+    "str": str,
+}
+
+# syntax which can be used in scripts. Scripts are expressions, which compare,
+# calculate or convert variables.
+_SCRIPT_NODES = (
+    ast.Expression,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Store,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Index,
+    ast.Slice,
+    ast.Call,
+    ast.keyword,
+    ast.List,
+    ast.Tuple,
+    ast.Dict,
+    ast.Set,
+    ast.ListComp,
+    ast.SetComp,
+    ast.DictComp,
+    ast.GeneratorExp,
+    ast.comprehension,
+    ast.IfExp,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.UnaryOp,
+    ast.Not,
+    ast.UAdd,
+    ast.USub,
+    ast.BinOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Is,
+    ast.IsNot,
+)
+
+
+class _ScriptValidator(ast.NodeVisitor):
+    """
+    Check a parsed script only uses the allowed syntax, and doesn't access private
+    names or attributes, like __class__.
+    """
+
+    def generic_visit(self, node: ast.AST) -> None:
+        if not isinstance(node, _SCRIPT_NODES):
+            raise LisaException(f"'{type(node).__name__}' is not supported in script")
+        super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:  # noqa: N802
+        if node.id.startswith("_"):
+            raise LisaException(f"name '{node.id}' is not supported in script")
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:  # noqa: N802
+        if node.attr.startswith("_"):
+            raise LisaException(f"attribute '{node.attr}' is not supported in script")
+        self.generic_visit(node)
+
 
 @dataclass_json()
 @dataclass
@@ -27,7 +117,8 @@ class ScriptTransformerSchema(schema.Transformer):
 class ScriptTransformer(Transformer):
     """
     It runs script on variables. below example will cover the "value" to
-    True/False with the script logic.
+    True/False with the script logic. Only a few builtins, like int, str and len,
+    can be used in scripts.
 
     - name: skipped
       value: $(skipped)
@@ -52,16 +143,40 @@ class ScriptTransformer(Transformer):
         self._index: int = 0
         self._items: List[Dict[str, Any]] = []
 
+        # validate and compile scripts once, so they are not parsed again on every
+        # run, and unsupported scripts fail before running any of them.
+        runbook: ScriptTransformerSchema = self.runbook
+        self._compiled_scripts: List[CodeType] = []
+        self._script_variables: List[Tuple[str, ...]] = []
+        validator = _ScriptValidator()
+        for item in runbook.scripts:
+            try:
+                tree = ast.parse(item.script, mode="eval")
+                validator.visit(tree)
+                code = compile(tree, f"<script {item.name}>", "eval")
+            except (SyntaxError, LisaException) as identifier:
+                raise LisaException(f"'{item.script}' cannot be compiled. {identifier}")
+            self._compiled_scripts.append(code)
+            self._script_variables.append(tuple(item.variables))
+
     def _internal_run(self) -> Dict[str, Any]:
         runbook: ScriptTransformerSchema = self.runbook
         result: Dict[str, Any] = {}
-        for item in runbook.scripts:
-            variables: Dict[str, Any] = {}
-            for key in item.variables:
-                variables[key] = self._runbook_builder.variables[key].data
+        runbook_variables = self._runbook_builder.variables
+        # scripts with the same variable names share the same variables in a run.
+        variables_cache: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        for item, code, keys in zip(
+            runbook.scripts, self._compiled_scripts, self._script_variables
+        ):
+            variables = variables_cache.get(keys)
+            if variables is None:
+                variables = {key: runbook_variables[key].data for key in keys}
+                variables_cache[keys] = variables
 
             try:
-                eval_result = eval(item.script, variables.copy())
+                eval_result = eval(
+                    code, {"__builtins__": _SCRIPT_BUILTINS, **variables}
+                )
             except Exception as identifier:
                 raise LisaException(
                     f"'{item.script}' failed, variables: {variables}. {identifier}"
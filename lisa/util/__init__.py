@@ -4,6 +4,7 @@
 import re
 import sys
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import (
     TYPE_CHECKING,
@@ -14,8 +15,10 @@ from typing import (
     List,
     Optional,
     Pattern,
+    Sequence,
     Type,
     TypeVar,
+    Union,
     cast,
 )
 
@@ -54,9 +57,8 @@ __ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
 # 18.04.5
 # 18.04
 __version_info_pattern = re.compile(
-    r"^[vV]?(?P<major>[0-9]*?)(?:\.|\-|\_)(?P<minor>[0-9]*?)(?:(?:\.|\-|\_)"
-    r"(?P<patch>[0-9]*?))?(?:(?:\.|\-|\_)(?P<prerelease>.*?))?$",
-    re.VERBOSE,
+    r"^[vV]?(?P<major>[0-9]+)[.\-_](?P<minor>[0-9]+)(?:[.\-_](?P<patch>[0-9]+))?"
+    r"(?:[.\-_](?P<prerelease>.*))?$"
 )
 
 # hooks manager helper, they must be same name.
@@ -246,16 +248,15 @@ class SwitchableMixin:
 
 def get_date_str(current: Optional[datetime] = None) -> str:
     if current is None:
-        current = datetime.now()
-    return current.utcnow().strftime("%Y%m%d")
+        current = datetime.utcnow()
+    return current.strftime("%Y%m%d")
 
 
 def get_datetime_path(current: Optional[datetime] = None) -> str:
+    # format date and time from the same value, so they don't cross midnight.
     if current is None:
-        current = datetime.now()
-    date = get_date_str(current)
-    time = current.utcnow().strftime("%H%M%S-%f")[:-3]
-    return f"{date}-{time}"
+        current = datetime.utcnow()
+    return current.strftime("%Y%m%d-%H%M%S-%f")[:-3]
 
 
 def get_public_key_data(private_key_file_path: str) -> str:
@@ -268,8 +269,7 @@ def get_public_key_data(private_key_file_path: str) -> str:
     public_key_file = Path(private_key_path).stem
     public_key_path = private_key_path.parent / f"{public_key_file}.pub"
     try:
-        with open(public_key_path, "r") as fp:
-            public_key_data = fp.read()
+        public_key_data = public_key_path.read_text()
     except FileNotFoundError:
         raise LisaException(f"public key file not exist {public_key_path}")
     return public_key_data
@@ -316,24 +316,35 @@ def set_filtered_fields(src: Any, dest: Any, fields: List[str]) -> None:
             setattr(dest, field_name, field_value)
 
 
-def find_patterns_in_lines(lines: str, patterns: List[Pattern[str]]) -> List[List[Any]]:
+@lru_cache(maxsize=1024)
+def _compile(pattern: str) -> Pattern[str]:
+    # the cache of re module is shared by the whole process, so patterns used by
+    # below functions are cached separately.
+    return re.compile(pattern)
+
+
+def _as_pattern(pattern: Union[str, Pattern[str]]) -> Pattern[str]:
+    if isinstance(pattern, str):
+        return _compile(pattern)
+    return pattern
+
+
+def find_patterns_in_lines(
+    lines: str, patterns: Sequence[Union[str, Pattern[str]]]
+) -> List[List[Any]]:
     """
     For each pattern: if a pattern needs one return, it returns [str]. if it
     needs multiple return, it retuns like [(str, str)].
     """
-    results: List[List[str]] = [[]] * len(patterns)
-    for index, pattern in enumerate(patterns):
-        if not results[index]:
-            results[index] = pattern.findall(lines)
-    return results
+    return [_as_pattern(pattern).findall(lines) for pattern in patterns]
 
 
 def get_matched_str(
-    content: str, pattern: Pattern[str], first_match: bool = True
+    content: str, pattern: Union[str, Pattern[str]], first_match: bool = True
 ) -> str:
     result: str = ""
     if content:
-        matched_item = pattern.findall(content)
+        matched_item = _as_pattern(pattern).findall(content)
         if matched_item:
             # if something matched, it's like ['matched']
             result = matched_item[0 if first_match else -1]
@@ -341,25 +352,35 @@ def get_matched_str(
 
 
 def find_patterns_groups_in_lines(
-    lines: str, patterns: List[Pattern[str]]
+    lines: str, patterns: Sequence[Union[str, Pattern[str]]]
 ) -> List[List[Dict[str, str]]]:
     """
     for each pattern find the matches and return with group names.
     """
-    results: List[List[Dict[str, str]]] = [[]] * len(patterns)
+    # each pattern needs its own list, [[]] * n shares the same list.
+    results: List[List[Dict[str, str]]] = [[] for _ in patterns]
+    # bind methods once, so they are not looked up on every line.
+    matchers = [
+        (_as_pattern(pattern).match, result)
+        for pattern, result in zip(patterns, results)
+    ]
     for line in lines.splitlines(keepends=False):
-        for index, pattern in enumerate(patterns):
-            matched = pattern.match(line)
+        for match, result in matchers:
+            matched = match(line)
             if matched:
-                results[index].append(matched.groupdict())
+                result.append(matched.groupdict())
     return results
 
 
-def find_groups_in_lines(lines: str, pattern: Pattern[str]) -> List[Dict[str, str]]:
+def find_groups_in_lines(
+    lines: str, pattern: Union[str, Pattern[str]]
+) -> List[Dict[str, str]]:
     return find_patterns_groups_in_lines(lines, [pattern])[0]
 
 
-def find_group_in_lines(lines: str, pattern: Pattern[str]) -> Dict[str, str]:
+def find_group_in_lines(
+    lines: str, pattern: Union[str, Pattern[str]]
+) -> Dict[str, str]:
     output = find_groups_in_lines(lines, pattern)
     if len(output) == 1:
         result = output[0]
@@ -374,21 +395,32 @@ def find_group_in_lines(lines: str, pattern: Pattern[str]) -> Dict[str, str]:
     return result
 
 
-def deep_update_dict(src: Dict[str, Any], dest: Dict[str, Any]) -> Dict[str, Any]:
-    if isinstance(dest, int) or isinstance(dest, bool) or isinstance(dest, float):
-        result = dest
-    else:
-        result = dest.copy()
-
-    if isinstance(result, dict):
-        for key, value in src.items():
-            if isinstance(value, dict) and key in dest:
-                value = deep_update_dict(value, dest[key])
-            result[key] = value
-    elif isinstance(src, dict):
-        result = src.copy()
-    else:
-        result = src
+def deep_update_dict(
+    src: Dict[str, Any], dest: Dict[str, Any], copy: bool = True
+) -> Dict[str, Any]:
+    """
+    Update dest with values from src recursively, values of src win. If copy is
+    True, dest is not changed, and only nested dicts updated by src are shallow
+    copied. If copy is False, dest is updated in place, and returned.
+    """
+    if not isinstance(dest, dict):
+        return src.copy() if isinstance(src, dict) else src
+
+    result = dest.copy() if copy else dest
+    # use a stack instead of recursion, it doesn't hit recursion limit on deep
+    # trees, and untouched branches are not copied.
+    stack = [(src, result)]
+    while stack:
+        current_src, current_dest = stack.pop()
+        for key, value in current_src.items():
+            dest_value = current_dest.get(key)
+            if isinstance(value, dict) and isinstance(dest_value, dict):
+                if copy:
+                    dest_value = dest_value.copy()
+                    current_dest[key] = dest_value
+                stack.append((value, dest_value))
+            else:
+                current_dest[key] = value
 
     return result
 
@@ -404,6 +436,9 @@ def is_valid_url(url: str, raise_error: bool = True) -> bool:
 
 
 def filter_ansi_escape(content: str) -> str:
+    # most outputs have no escape, and the check is much faster than sub.
+    if "\x1B" not in content:
+        return content
     return __ansi_escape.sub("", content)
 
 
@@ -412,8 +447,7 @@ def dump_file(file_name: Path, content: Any) -> None:
     # an error will be raised. Want to ensure logs only put under run local path
     file_name.absolute().relative_to(constants.RUN_LOCAL_PATH)
     file_name.parent.mkdir(parents=True, exist_ok=True)
-    with open(file_name, "w") as f:
-        f.write(secret.mask(content))
+    file_name.write_text(secret.mask(content))
 
 
 def parse_version(version: str) -> VersionInfo:
@@ -434,6 +468,11 @@ def parse_version(version: str) -> VersionInfo:
         belong to a basic version.
     :rtype: tuple(:class:`Version` | None, str)
     """
+    # most versions are like 1.2.3, create it without regex.
+    parts = version.split(".")
+    if len(parts) == 3 and all(part.isdecimal() for part in parts):
+        return VersionInfo(int(parts[0]), int(parts[1]), int(parts[2]))
+
     if VersionInfo.isvalid(version):
         return VersionInfo.parse(version)
 
@@ -475,5 +514,8 @@ def field_metadata(
     )
 
 
+@lru_cache(maxsize=None)
 def is_unittest() -> bool:
+    # argv doesn't change in a process, so check it once. It's checked on first
+    # call instead of import, because unittest updates argv[0] on start.
     return "unittest" in sys.argv[0]
@@ -7,7 +7,8 @@ from concurrent.futures import (
     ThreadPoolExecutor,
     wait,
 )
-from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generic, List, Optional, TypeVar
 
 from assertpy import assert_that
 
@@ -16,6 +17,10 @@ from lisa.util.perf_timer import create_timer
 
 from . import LisaException
 
+if TYPE_CHECKING:
+    from lisa.environment import Environment
+    from lisa.node import Node
+
 T_RESULT = TypeVar("T_RESULT")
 
 
@@ -132,6 +137,30 @@ class TaskManager(Generic[T_RESULT]):
         assert_that(remaining_worker_count).is_zero()
 
 
+def run_in_parallel(
+    tasks: List[Callable[[], T_RESULT]], max_workers: int = 0
+) -> List[T_RESULT]:
+    """
+    Run independent tasks in parallel. Results are in the same order of tasks. If
+    any task raises an exception, it's raised after all tasks are finished.
+    """
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as pool:
+        futures = [pool.submit(task) for task in tasks]
+    return [future.result() for future in futures]
+
+
+def run_on_nodes(
+    environment: "Environment", func: Callable[["Node"], T_RESULT]
+) -> List[T_RESULT]:
+    """
+    Run func on all nodes of the environment in parallel. Results are in the same
+    order of nodes.
+    """
+    return run_in_parallel([partial(func, node) for node in environment.nodes.list()])
+
+
 _default_task_manager: Optional[TaskManager[Any]] = None
 
 
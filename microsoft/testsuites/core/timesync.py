@@ -1,6 +1,7 @@
+import re
+import shlex
 from pathlib import PurePosixPath
-from time import sleep
-from typing import List, Optional, Union
+from typing import Dict, FrozenSet, List, Optional, Union
 
 from assertpy import assert_that
 
@@ -11,12 +12,28 @@ from lisa import (
     TestSuite,
     TestSuiteMetadata,
     UnsupportedCpuArchitectureException,
-    create_timer,
 )
 from lisa.operating_system import CpuArchitecture, Redhat
 from lisa.tools import Cat, Chrony, Dmesg, Hwclock, Lscpu, Ntp, Ntpstat, Service
 from lisa.tools.lscpu import CpuType
 
+# expected clock sources and clock events of each architecture.
+_clocksource_map: Dict[CpuArchitecture, FrozenSet[str]] = {
+    CpuArchitecture.X64: frozenset(
+        [
+            "hyperv_clocksource_tsc_page",
+            "lis_hyperv_clocksource_tsc_page",
+            "hyperv_clocksource",
+            "tsc",
+        ]
+    ),
+    CpuArchitecture.ARM64: frozenset(["arch_sys_counter"]),
+}
+_clockevent_map: Dict[CpuArchitecture, str] = {
+    CpuArchitecture.X64: "Hyper-V clockevent",
+    CpuArchitecture.ARM64: "arch_sys_timer",
+}
+
 
 def _wait_file_changed(
     node: Node,
@@ -24,18 +41,23 @@ def _wait_file_changed(
     expected_value: Optional[Union[str, List[str]]],
 ) -> bool:
     timeout = 60
-    timout_timer = create_timer()
-    while timout_timer.elapsed(False) < timeout:
-        cat = node.tools[Cat]
-        result = cat.run(path, force_run=True)
-        if isinstance(expected_value, list):
-            if result.stdout in expected_value:
-                return True
-        else:
-            if result.stdout == expected_value:
-                return True
-        sleep(0.5)
-    return False
+    interval = 0.5
+    # duplicated values don't need to be compared again in each check.
+    expected_values = frozenset(
+        expected_value if isinstance(expected_value, list) else [str(expected_value)]
+    )
+    # poll in one command on the node, instead of one command per check. The
+    # inotify doesn't work here, because sysfs files don't send modify events.
+    values = " ".join(shlex.quote(value) for value in sorted(expected_values))
+    result = node.execute(
+        f"for i in $(seq {int(timeout / interval)}); do "
+        f"v=$(cat {path}); "
+        f'for e in {values}; do [ "$v" = "$e" ] && exit 0; done; '
+        f"sleep {interval}; done; exit 1",
+        shell=True,
+        timeout=timeout * 2,
+    )
+    return result.exit_code == 0
 
 
 @TestSuiteMetadata(
@@ -85,11 +107,15 @@ class TimeSync(TestSuite):
         assert_that(dmesg.get_output()).contains(self.ptp_registered_msg)
 
         # 2. PTP device name is hyperv.
+        # read the clock name and chrony configs in one command, config files
+        # which don't exist are not returned.
+        clock_name_path = "/sys/class/ptp/ptp0/clock_name"
         cat = node.tools[Cat]
-        clock_name_result = cat.run("/sys/class/ptp/ptp0/clock_name")
-        assert_that(clock_name_result.stdout).described_as(
+        contents = cat.read_multiple([clock_name_path, *self.chrony_path])
+        clock_name = contents.get(clock_name_path, "")
+        assert_that(clock_name).described_as(
             f"ptp clock name should be 'hyperv', meaning the Azure host, "
-            f"but it is {clock_name_result.stdout}, more info please refer "
+            f"but it is {clock_name}, more info please refer "
             f"https://docs.microsoft.com/en-us/azure/virtual-machines/linux/time-sync#check-for-ptp-clock-source"  # noqa: E501
         ).is_equal_to("hyperv")
 
@@ -106,9 +132,8 @@ class TimeSync(TestSuite):
         # 4. Chrony should be configured to use the symlink /dev/ptp_hyperv
         #  instead of /dev/ptp0 or /dev/ptp1.
         for chrony_config in self.chrony_path:
-            if node.shell.exists(PurePosixPath(chrony_config)):
-                chrony_results = cat.run(f"{chrony_config}")
-                assert_that(chrony_results.stdout).described_as(
+            if chrony_config in contents:
+                assert_that(contents[chrony_config]).described_as(
                     "Chrony config file should use the symlink /dev/ptp_hyperv."
                 ).contains(self.hyperv_ptp_udev_rule)
 
@@ -131,37 +156,30 @@ class TimeSync(TestSuite):
     def timesync_check_unbind_clocksource(self, node: Node) -> None:
         # 1. Check clock source name is one of hyperv_clocksource_tsc_page,
         #  lis_hv_clocksource_tsc_page, hyperv_clocksource.
-        clocksource_map = {
-            CpuArchitecture.X64: [
-                "hyperv_clocksource_tsc_page",
-                "lis_hyperv_clocksource_tsc_page",
-                "hyperv_clocksource",
-                "tsc",
-            ],
-            CpuArchitecture.ARM64: [
-                "arch_sys_counter",
-            ],
-        }
         lscpu = node.tools[Lscpu]
         arch = lscpu.get_architecture()
-        clocksource = clocksource_map.get(CpuArchitecture(arch), None)
+        clocksource = _clocksource_map.get(CpuArchitecture(arch), None)
         if not clocksource:
             raise UnsupportedCpuArchitectureException(arch)
+        # read files used by below steps in one command.
         cat = node.tools[Cat]
-        clock_source_result = cat.run(self.current_clocksource)
-        assert_that([clock_source_result.stdout]).described_as(
-            f"Expected clocksource name is one of {clocksource},"
-            f" but actual it is {clock_source_result.stdout}."
+        contents = cat.read_multiple(
+            [self.current_clocksource, self.available_clocksource, "/proc/cpuinfo"]
+        )
+        current_clocksource = contents.get(self.current_clocksource, "")
+        assert_that([current_clocksource]).described_as(
+            f"Expected clocksource name is one of {sorted(clocksource)},"
+            f" but actual it is {current_clocksource}."
         ).is_subset_of(clocksource)
 
         # 2. Check CPU flag contains constant_tsc from /proc/cpuinfo.
         if CpuArchitecture.X64 == arch:
-            cpu_info_result = cat.run("/proc/cpuinfo")
+            cpu_info = contents.get("/proc/cpuinfo", "")
             if CpuType.Intel == lscpu.get_cpu_type():
                 expected_tsc_str = " constant_tsc "
             elif CpuType.AMD == lscpu.get_cpu_type():
                 expected_tsc_str = " tsc "
-            shown_up_times = cpu_info_result.stdout.count(expected_tsc_str)
+            shown_up_times = cpu_info.count(expected_tsc_str)
             assert_that(shown_up_times).described_as(
                 f"Expected {expected_tsc_str} shown up times in cpu flags is"
                 " equal to cpu count."
@@ -170,19 +188,20 @@ class TimeSync(TestSuite):
         # 3. Check clocksource name shown up in dmesg.
         dmesg = node.tools[Dmesg]
         assert_that(dmesg.get_output()).described_as(
-            f"Expected clocksource {clock_source_result.stdout} shown up in dmesg."
-        ).contains(f"clocksource {clock_source_result.stdout}")
+            f"Expected clocksource {current_clocksource} shown up in dmesg."
+        ).contains(f"clocksource {current_clocksource}")
 
         # 4. Unbind current clock source if there are 2+ clock sources,
         # check current clock source can be switched to a different one.
         if node.shell.exists(PurePosixPath(self.unbind_clocksource)):
-            available_clocksources = cat.run(self.available_clocksource)
-            available_clocksources_array = available_clocksources.stdout.split(" ")
+            available_clocksources_array = contents.get(
+                self.available_clocksource, ""
+            ).split(" ")
             # We can not unbind clock source if there is only one existed.
             if len(available_clocksources_array) > 1:
-                available_clocksources_array.remove(clock_source_result.stdout)
+                available_clocksources_array.remove(current_clocksource)
                 cmd_result = node.execute(
-                    f"echo {clock_source_result.stdout} > {self.unbind_clocksource}",
+                    f"echo {current_clocksource} > {self.unbind_clocksource}",
                     sudo=True,
                     shell=True,
                 )
@@ -192,7 +211,7 @@ class TimeSync(TestSuite):
                     node, self.current_clocksource, available_clocksources_array
                 )
                 assert_that(clock_source_result_expected).described_as(
-                    f"After unbind {clock_source_result.stdout}, current clock source "
+                    f"After unbind {current_clocksource}, current clock source "
                     f"doesn't switch properly."
                 ).is_true()
 
@@ -209,40 +228,49 @@ class TimeSync(TestSuite):
         priority=2,
     )
     def timesync_check_unbind_clockevent(self, node: Node) -> None:
-        if node.shell.exists(PurePosixPath(self.current_clockevent)):
+        # read the current clock event and timer list in one command, the timer
+        # list needs sudo.
+        timer_list_path = "/proc/timer_list"
+        cat = node.tools[Cat]
+        contents = cat.read_multiple(
+            [self.current_clockevent, timer_list_path], sudo=True
+        )
+        if self.current_clockevent in contents:
             # 1. Current clock event name is 'Hyper-V clockevent'.
-            clockevent_map = {
-                CpuArchitecture.X64: "Hyper-V clockevent",
-                CpuArchitecture.ARM64: "arch_sys_timer",
-            }
             lscpu = node.tools[Lscpu]
             arch = lscpu.get_architecture()
-            clock_event_name = clockevent_map.get(CpuArchitecture(arch), None)
+            clock_event_name = _clockevent_map.get(CpuArchitecture(arch), None)
             if not clock_event_name:
                 raise UnsupportedCpuArchitectureException(arch)
-            cat = node.tools[Cat]
-            clock_event_result = cat.run(self.current_clockevent)
-            assert_that(clock_event_result.stdout).described_as(
+            current_clockevent = contents[self.current_clockevent]
+            assert_that(current_clockevent).described_as(
                 f"Expected clockevent name is {clock_event_name}, "
-                f"but actual it is {clock_event_result.stdout}."
+                f"but actual it is {current_clockevent}."
             ).is_equal_to(clock_event_name)
 
             # 2. 'Hyper-V clockevent' and 'hrtimer_interrupt' show up times in
             #  /proc/timer_list should equal to cpu count.
             event_handler_name = "hrtimer_interrupt"
-            timer_list_result = cat.run("/proc/timer_list", sudo=True)
-            lscpu = node.tools[Lscpu]
             core_count = lscpu.get_core_count()
-            event_handler_times = timer_list_result.stdout.count(
-                f"{event_handler_name}"
+            # count both names in one pass, and match whole names only, so
+            # names like hrtimer_interrupt_hires are not counted.
+            names_pattern = re.compile(
+                rf"\b(?:({re.escape(event_handler_name)})|"
+                rf"({re.escape(clock_event_name)}))\b"
             )
+            event_handler_times = 0
+            clock_event_times = 0
+            for event_handler, clock_event in names_pattern.findall(
+                contents.get(timer_list_path, "")
+            ):
+                event_handler_times += bool(event_handler)
+                clock_event_times += bool(clock_event)
             assert_that(event_handler_times).described_as(
                 f"Expected {event_handler_name} shown up {core_count} times in output "
                 f"of /proc/timer_list, but actual it shows up "
                 f"{event_handler_times} times."
             ).is_equal_to(core_count)
 
-            clock_event_times = timer_list_result.stdout.count(f"{clock_event_name}")
             assert_that(clock_event_times).described_as(
                 f"Expected {clock_event_name} shown up {core_count} times in output "
                 f"of /proc/timer_list, but actual it shows up "
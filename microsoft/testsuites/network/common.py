@@ -1,14 +1,18 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
-from typing import Dict, List, cast
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 from assertpy import assert_that
 from retry import retry
+from retry.api import retry_call
 
 from lisa import Environment, Node, RemoteNode, constants
 from lisa.features import NetworkInterface
 from lisa.nic import NicInfo, Nics
-from lisa.tools import Cat, Firewall, Kill, Lsmod, Lspci, Modprobe, Ssh
+from lisa.tools import Firewall, Kill, Lsmod, Lspci, Modprobe, Ping, Ssh
+from lisa.util.parallel import run_in_parallel, run_on_nodes
+from lisa.util.process import Process
 
 # ConnectX-3 uses mlx4_core
 # mlx4_en and mlx4_ib depends on mlx4_core
@@ -20,20 +24,47 @@ reload_modules_dict: Dict[str, List[str]] = {
     "mlx5_core": ["mlx5_ib"],
     "mlx4_core": ["mlx4_en", "mlx4_ib"],
 }
+# one of them is loaded, if the sriov network device works.
+_sriov_modules = frozenset(["mlx4_core", "mlx4_en", "mlx5_core", "ixgbevf"])
+# VFs may take time to be ready, retry up to about 5 minutes.
+_sriov_retry_kwargs: Dict[str, Any] = {
+    "exceptions": AssertionError,
+    "tries": 16,
+    "delay": 0.5,
+    "backoff": 2,
+    "max_delay": 30,
+    "jitter": (0, 0.5),
+}
+
+
+def _get_nic_info(node: Node) -> Dict[str, NicInfo]:
+    node_nic_info = Nics(node)
+    node_nic_info.initialize()
+    for _, node_nic in node_nic_info.nics.items():
+        assert_that(node_nic.lower).described_as(
+            f"This interface {node_nic.upper} does not have a paired VF."
+        ).is_not_empty()
+    return node_nic_info.nics
 
 
-@retry(exceptions=AssertionError, tries=150, delay=2)  # type: ignore
 def initialize_nic_info(environment: Environment) -> Dict[str, Dict[str, NicInfo]]:
     vm_nics: Dict[str, Dict[str, NicInfo]] = {}
-    for node in environment.nodes.list():
-        node_nic_info = Nics(node)
-        node_nic_info.initialize()
-        for _, node_nic in node_nic_info.nics.items():
-            assert_that(node_nic.lower).described_as(
-                f"This interface {node_nic.upper} does not have a paired VF."
-            ).is_not_empty()
-        vm_nics[node.name] = node_nic_info.nics
-    return vm_nics
+
+    def _initialize_node(node: Node) -> None:
+        vm_nics[node.name] = _get_nic_info(node)
+
+    # only nodes, which are not initialized, are initialized again in retries.
+    def _initialize_pending_nodes() -> None:
+        run_in_parallel(
+            [
+                partial(_initialize_node, node)
+                for node in environment.nodes.list()
+                if node.name not in vm_nics
+            ]
+        )
+
+    retry_call(_initialize_pending_nodes, **_sriov_retry_kwargs)
+    return {node.name: vm_nics[node.name] for node in environment.nodes.list()}
 
 
 def remove_module(node: Node) -> str:
@@ -56,22 +87,59 @@ def load_module(node: Node, module_name: str) -> None:
     modprobe.load(module_name)
 
 
-def get_packets(node: Node, nic_name: str, name: str = "tx_packets") -> int:
-    cat = node.tools[Cat]
-    return int(cat.read(f"/sys/class/net/{nic_name}/statistics/{name}", force_run=True))
+def get_nics_packets(
+    node: Node,
+    nic_names: List[str],
+    name: str = "tx_packets",
+    down_nics: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """
+    Read a statistic of all nics in one command. The links of down_nics are set
+    down before reading.
+    """
+    if not nic_names:
+        # grep reads stdin without files, so nothing is run.
+        return {}
+    paths = {
+        f"/sys/class/net/{nic_name}/statistics/{name}": nic_name
+        for nic_name in nic_names
+    }
+    commands: List[str] = [f"ip link set dev {nic} down" for nic in down_nics or []]
+    # grep prints each file with its name, like path:value
+    commands.append(f"grep -H . {' '.join(paths)}")
+    result = node.execute(
+        " && ".join(commands),
+        shell=True,
+        sudo=bool(down_nics),
+        expected_exit_code=0,
+        expected_exit_code_failure_message=f"fail to get {name} of {nic_names}",
+    )
+    # ip link doesn't print on success, so all lines are statistics.
+    path_values = (line.rsplit(":", maxsplit=1) for line in result.stdout.splitlines())
+    return {paths[path]: int(value) for path, value in path_values}
+
 
+def _set_links_up(node: Node, nic_names: List[str]) -> None:
+    if not nic_names:
+        return
+    # it runs in cleanup, so errors are logged only, and all links are tried.
+    node.execute(
+        "; ".join(f"ip link set dev {nic} up" for nic in nic_names),
+        shell=True,
+        sudo=True,
+    )
 
-@retry(exceptions=AssertionError, tries=150, delay=2)  # type: ignore
+
+@retry(**_sriov_retry_kwargs)  # type: ignore
 def sriov_basic_test(
     environment: Environment, vm_nics: Dict[str, Dict[str, NicInfo]]
 ) -> None:
-    for node in environment.nodes.list():
+    def _check_node(node: Node) -> None:
         # 1. Check module of sriov network device is loaded.
-        modules_exist = False
+        # the modules are loaded during retries, so they are read again.
         lsmod = node.tools[Lsmod]
-        for module in ["mlx4_core", "mlx4_en", "mlx5_core", "ixgbevf"]:
-            if lsmod.module_exists(module):
-                modules_exist = True
+        loaded_modules = lsmod.get_loaded_modules(force_run=True)
+        modules_exist = not _sriov_modules.isdisjoint(loaded_modules)
         assert_that(modules_exist).described_as(
             "The module of sriov network device isn't loaded."
         ).is_true()
@@ -86,6 +154,8 @@ def sriov_basic_test(
             " please check the driver works properly"
         ).is_length(len(vm_nics[node.name]))
 
+    run_on_nodes(environment, _check_node)
+
 
 def sriov_vf_connection_test(
     environment: Environment,
@@ -97,102 +167,162 @@ def sriov_vf_connection_test(
     dest_node = cast(RemoteNode, environment.nodes[1])
     source_ssh = source_node.tools[Ssh]
     dest_ssh = dest_node.tools[Ssh]
+    source_ping = source_node.tools[Ping]
 
-    dest_ssh.enable_public_key(source_ssh.generate_key_pairs())
-    # generate 200Mb file
-    source_node.execute("dd if=/dev/urandom of=large_file bs=100 count=0 seek=2M")
-    max_retry_times = 10
-    for _, source_nic_info in vm_nics[source_node.name].items():
-        matched_dest_nic_name = ""
-        for dest_nic_name, dest_nic_info in vm_nics[dest_node.name].items():
-            # only when IPs are in the same subnet, IP1 of machine A can connect to
-            # IP2 of machine B
-            # e.g. eth2 IP is 10.0.2.3 on machine A, eth2 IP is 10.0.3.4 on machine
-            # B, use nic name doesn't work in this situation
-            if (
-                dest_nic_info.ip_addr.rsplit(".", maxsplit=1)[0]
-                == source_nic_info.ip_addr.rsplit(".", maxsplit=1)[0]
-            ):
-                matched_dest_nic_name = dest_nic_name
-                break
+    dest_ssh.enable_public_key(source_ssh.get_or_generate_key_pairs())
+    # generate 200Mb file, it's reused if it's generated by previous calls.
+    source_node.execute(
+        "test -s large_file || fallocate -l 200M large_file"
+        " || truncate -s 200M large_file",
+        shell=True,
+    )
+    ping_deadline = 10
+    # only when IPs are in the same subnet, IP1 of machine A can connect to
+    # IP2 of machine B
+    # e.g. eth2 IP is 10.0.2.3 on machine A, eth2 IP is 10.0.3.4 on machine
+    # B, use nic name doesn't work in this situation
+    dest_nic_names_by_subnet: Dict[str, str] = {}
+    for dest_nic_name, dest_nic_info in vm_nics[dest_node.name].items():
+        dest_nic_names_by_subnet.setdefault(
+            dest_nic_info.ip_addr.rsplit(".", maxsplit=1)[0], dest_nic_name
+        )
+    nic_pairs: List[Tuple[NicInfo, str]] = []
+    for source_nic_info in vm_nics[source_node.name].values():
+        matched_dest_nic_name = dest_nic_names_by_subnet.get(
+            source_nic_info.ip_addr.rsplit(".", maxsplit=1)[0], ""
+        )
         assert_that(matched_dest_nic_name).described_as(
             f"can't find the same subnet nic with {source_nic_info.ip_addr} on"
             f" machine {source_node.name}, please check network setting of "
             f"machine {dest_node.name}."
         ).is_not_empty()
-        desc_nic_info = vm_nics[dest_node.name][matched_dest_nic_name]
-        dest_ip = vm_nics[dest_node.name][matched_dest_nic_name].ip_addr
-        source_ip = source_nic_info.ip_addr
-        source_synthetic_nic = source_nic_info.upper
-        dest_synthetic_nic = desc_nic_info.upper
-        source_nic = source_vf_nic = source_nic_info.lower
-        dest_nic = dest_vf_nic = desc_nic_info.lower
-
-        if remove_module or turn_off_vf:
-            source_nic = source_synthetic_nic
-            dest_nic = dest_synthetic_nic
-        if turn_off_vf:
-            source_node.execute(f"ip link set dev {source_vf_nic} down", sudo=True)
-            dest_node.execute(f"ip link set dev {dest_vf_nic} down", sudo=True)
-
-        # get origin tx_packets and rx_packets before copy file
-        source_tx_packets_origin = get_packets(source_node, source_nic)
-        dest_tx_packets_origin = get_packets(dest_node, dest_nic, "rx_packets")
-
-        # check the connectivity between source and dest machine using ping
-        for _ in range(max_retry_times):
-            cmd_result = source_node.execute(
-                f"ping -c 1 {dest_ip} -I {source_synthetic_nic}"
-            )
-            if cmd_result.exit_code == 0:
-                break
-        cmd_result.assert_exit_code(
-            message=f"fail to ping {dest_ip} from {source_node.name} to "
-            f"{dest_node.name} after retry {max_retry_times}"
+        nic_pairs.append((source_nic_info, matched_dest_nic_name))
+
+    dest_nic_infos = [vm_nics[dest_node.name][name] for _, name in nic_pairs]
+    source_nic_infos = [source_nic_info for source_nic_info, _ in nic_pairs]
+    if remove_module or turn_off_vf:
+        source_nics = [x.upper for x in source_nic_infos]
+        dest_nics = [x.upper for x in dest_nic_infos]
+    else:
+        source_nics = [x.lower for x in source_nic_infos]
+        dest_nics = [x.lower for x in dest_nic_infos]
+    # vf nics are set down in the same command, which gets packets, and they are
+    # set up in the end, even if the test fails.
+    source_down_nics: List[str] = []
+    dest_down_nics: List[str] = []
+    if turn_off_vf:
+        source_down_nics = [x.lower for x in source_nic_infos]
+        dest_down_nics = [x.lower for x in dest_nic_infos]
+
+    processes: List[Process] = []
+    try:
+        # get origin tx_packets and rx_packets of all nics before copy file, the
+        # source and dest nodes are read at the same time.
+        source_tx_packets_origin, dest_rx_packets_origin = run_in_parallel(
+            [
+                partial(
+                    get_nics_packets,
+                    source_node,
+                    source_nics,
+                    down_nics=source_down_nics,
+                ),
+                partial(
+                    get_nics_packets,
+                    dest_node,
+                    dest_nics,
+                    "rx_packets",
+                    down_nics=dest_down_nics,
+                ),
+            ]
         )
 
+        # nic pairs are tested at the same time, each of them has its own subnet and
+        # vf. So the commands of all pairs are started, and then waited.
+        ips = [
+            (source_nic_info.ip_addr, vm_nics[dest_node.name][dest_nic_name].ip_addr)
+            for source_nic_info, dest_nic_name in nic_pairs
+        ]
+        # check the connectivity between source and dest machine using ping, it
+        # returns on the first reply.
+        ping_processes = [
+            source_ping.ping_async(
+                target=dest_ip,
+                nic_name=source_nic_info.upper,
+                count=1,
+                deadline=ping_deadline,
+            )
+            for (source_nic_info, _), (_, dest_ip) in zip(nic_pairs, ips)
+        ]
+        processes.extend(ping_processes)
+        for process, (_, dest_ip) in zip(ping_processes, ips):
+            process.wait_result().assert_exit_code(
+                message=f"fail to ping {dest_ip} from {source_node.name} to "
+                f"{dest_node.name} in {ping_deadline} seconds"
+            )
+
         # copy 200 Mb file from source ip to dest ip
-        cmd_result = source_node.execute(
-            f"scp -o BindAddress={source_ip} -i ~/.ssh/id_rsa -o"
-            f" StrictHostKeyChecking=no large_file "
-            f"$USER@{dest_ip}:/tmp/large_file",
-            shell=True,
-            expected_exit_code=0,
-            expected_exit_code_failure_message="Fail to copy file large_file from"
-            f" {source_ip} to {dest_ip}",
+        copy_processes = [
+            source_node.execute_async(
+                f"scp -o BindAddress={source_ip} -i ~/.ssh/id_rsa -o"
+                " StrictHostKeyChecking=no -o BatchMode=yes"
+                " -o UserKnownHostsFile=/dev/null -o LogLevel=ERROR large_file "
+                f"$USER@{dest_ip}:/tmp/large_file_{dest_nic_name}",
+                shell=True,
+            )
+            for (_, dest_nic_name), (source_ip, dest_ip) in zip(nic_pairs, ips)
+        ]
+        processes.extend(copy_processes)
+        for process, (source_ip, dest_ip) in zip(copy_processes, ips):
+            process.wait_result(
+                expected_exit_code=0,
+                expected_exit_code_failure_message="Fail to copy file large_file from"
+                f" {source_ip} to {dest_ip}",
+            )
+
+        source_tx_packets, dest_rx_packets = run_in_parallel(
+            [
+                partial(get_nics_packets, source_node, source_nics),
+                partial(get_nics_packets, dest_node, dest_nics, "rx_packets"),
+            ]
+        )
+        for source_nic, dest_nic in zip(source_nics, dest_nics):
+            # verify tx_packets value of source nic is increased after coping 200Mb
+            #  file from source to dest
+            assert_that(
+                source_tx_packets[source_nic], "insufficient TX packets sent"
+            ).is_greater_than(source_tx_packets_origin[source_nic])
+            # verify rx_packets value of dest nic is increased after receiving 200Mb
+            #  file from source to dest
+            assert_that(
+                dest_rx_packets[dest_nic], "insufficient RX packets received"
+            ).is_greater_than(dest_rx_packets_origin[dest_nic])
+    finally:
+        # if any command fails, others may be still running. Stop them, so they
+        # don't write files, which are removed below.
+        for process in processes:
+            if process.is_running():
+                process.kill()
+                process.wait_result(timeout=60)
+        # restore vf links, so following test cases are not impacted.
+        run_in_parallel(
+            [
+                partial(_set_links_up, source_node, source_down_nics),
+                partial(_set_links_up, dest_node, dest_down_nics),
+            ]
         )
-        source_tx_packets = get_packets(source_node, source_nic)
-        dest_tx_packets = get_packets(dest_node, dest_nic, "rx_packets")
-        # verify tx_packets value of source nic is increased after coping 200Mb file
-        #  from source to dest
-        assert_that(
-            int(source_tx_packets), "insufficient TX packets sent"
-        ).is_greater_than(int(source_tx_packets_origin))
-        # verify rx_packets value of dest nic is increased after receiving 200Mb
-        #  file from source to dest
-        assert_that(
-            int(dest_tx_packets), "insufficient RX packets received"
-        ).is_greater_than(int(dest_tx_packets_origin))
-
-        if turn_off_vf:
-            source_node.execute(f"ip link set dev {source_vf_nic} up", sudo=True)
-            dest_node.execute(f"ip link set dev {dest_vf_nic} up", sudo=True)
+        # each pair copies to its own file, remove them to free space.
+        dest_node.execute("rm -f /tmp/large_file_*", shell=True)
 
 
 def stop_firewall(environment: Environment) -> None:
-    for node in environment.nodes.list():
-        firewall = node.tools[Firewall]
-        firewall.stop()
+    run_on_nodes(environment, lambda node: node.tools[Firewall].stop())
 
 
 def cleanup_iperf3(environment: Environment) -> None:
-    for node in environment.nodes.list():
-        kill = node.tools[Kill]
-        kill.by_name("iperf3")
+    run_on_nodes(environment, lambda node: node.tools[Kill].by_name("iperf3"))
 
 
 def remove_extra_nics(environment: Environment) -> None:
-    for node in environment.nodes.list():
-        node = cast(RemoteNode, environment.nodes[0])
-        network_interface_feature = node.features[NetworkInterface]
-        network_interface_feature.remove_extra_nics()
+    run_on_nodes(
+        environment, lambda node: node.features[NetworkInterface].remove_extra_nics()
+    )
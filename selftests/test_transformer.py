@@ -11,6 +11,7 @@ from dataclasses_json import dataclass_json
 from lisa import LisaException, constants, schema, transformer
 from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.transformer import Transformer
+from lisa.transformers import script_transformer  # noqa: F401
 from lisa.variable import VariableEntry
 
 MOCK = "mock"
@@ -167,6 +168,78 @@ class TestTransformerCase(TestCase):
             result,
         )
 
+    def test_transformer_script(self) -> None:
+        # scripts are evaluated with their variables
+        transformers_data: List[Any] = [
+            {
+                "type": "script",
+                "name": "s",
+                "scripts": [
+                    {
+                        "name": "is_original",
+                        "variables": ["v0"],
+                        "script": "v0 == 'original'",
+                    },
+                    {"name": "length", "variables": ["va"], "script": "len(va)"},
+                ],
+            }
+        ]
+        transformers = schema.load_by_type_many(schema.Transformer, transformers_data)
+        runbook_builder = self._generate_runbook_builder(transformers)
+
+        result = transformer._run_transformers(runbook_builder)
+        self.assertTrue(result["s_is_original"].data)
+        self.assertEqual(8, result["s_length"].data)
+
+    def test_transformer_script_invalid(self) -> None:
+        # a script with syntax error fails before running
+        transformers_data: List[Any] = [
+            {
+                "type": "script",
+                "name": "s",
+                "scripts": [{"name": "r", "variables": ["v0"], "script": "v0 =="}],
+            }
+        ]
+        transformers = schema.load_by_type_many(schema.Transformer, transformers_data)
+        runbook_builder = self._generate_runbook_builder(transformers)
+
+        with self.assertRaises(LisaException):
+            transformer._run_transformers(runbook_builder)
+
+    def test_transformer_script_limited_builtins(self) -> None:
+        # builtins out of the allowed list cannot be used in scripts
+        transformers_data: List[Any] = [
+            {
+                "type": "script",
+                "name": "s",
+                "scripts": [{"name": "r", "variables": [], "script": "open('x')"}],
+            }
+        ]
+        transformers = schema.load_by_type_many(schema.Transformer, transformers_data)
+        runbook_builder = self._generate_runbook_builder(transformers)
+
+        # the script passes validation, and fails when it runs.
+        with self.assertRaisesRegex(LisaException, "name 'open' is not defined"):
+            transformer._run_transformers(runbook_builder)
+
+    def test_transformer_script_unsupported_syntax(self) -> None:
+        # private attributes and statements are not allowed in scripts
+        for script in ["().__class__", "(x := 1)", "lambda: 1"]:
+            transformers_data: List[Any] = [
+                {
+                    "type": "script",
+                    "name": "s",
+                    "scripts": [{"name": "r", "variables": [], "script": script}],
+                }
+            ]
+            transformers = schema.load_by_type_many(
+                schema.Transformer, transformers_data
+            )
+            runbook_builder = self._generate_runbook_builder(transformers)
+
+            with self.assertRaises(LisaException):
+                transformer._run_transformers(runbook_builder)
+
     def _validate_variables(
         self, expected: Dict[str, str], actual: Dict[str, VariableEntry]
     ) -> None:
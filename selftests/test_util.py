@@ -0,0 +1,147 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import re
+from datetime import datetime
+from functools import partial
+from types import SimpleNamespace
+from unittest.case import TestCase
+
+from lisa.util import (
+    LisaException,
+    deep_update_dict,
+    fields_to_dict,
+    filter_ansi_escape,
+    find_patterns_groups_in_lines,
+    find_patterns_in_lines,
+    get_date_str,
+    get_datetime_path,
+    get_matched_str,
+    is_valid_url,
+    parse_version,
+    set_filtered_fields,
+)
+from lisa.util.parallel import run_in_parallel
+
+
+class UtilTestCase(TestCase):
+    def test_find_patterns_in_lines(self) -> None:
+        lines = "id 1 name a\nid 2 name b\nother line\r\nname c"
+        results = find_patterns_in_lines(
+            lines,
+            [
+                re.compile(r"^id (\d+) name (\w+)$", re.M),
+                re.compile(r"name (\w+)"),
+                re.compile(r"not exist"),
+            ],
+        )
+        self.assertListEqual([("1", "a"), ("2", "b")], results[0])
+        self.assertListEqual(["a", "b", "c"], results[1])
+        self.assertListEqual([], results[2])
+
+    def test_find_patterns_in_lines_multiple_in_line(self) -> None:
+        results = find_patterns_in_lines("sda1 sda2\nsdb1", [re.compile(r"sd\w\d")])
+        self.assertListEqual(["sda1", "sda2", "sdb1"], results[0])
+
+    def test_find_patterns_in_lines_whole_text(self) -> None:
+        # patterns are matched on the whole text, not line by line.
+        results = find_patterns_in_lines(
+            "a\r\nb",
+            [re.compile(r"^b$"), re.compile(r"a\s+b"), re.compile(r"^a$", re.M)],
+        )
+        self.assertListEqual([[], ["a\r\nb"], []], results)
+
+    def test_find_patterns_groups_in_lines(self) -> None:
+        results = find_patterns_groups_in_lines(
+            "a=1\nb=2\nc 3",
+            [
+                re.compile(r"^(?P<key>\w)=(?P<value>\d)$"),
+                re.compile(r"^(?P<key>c) (?P<value>\d)$"),
+            ],
+        )
+        self.assertListEqual(
+            [{"key": "a", "value": "1"}, {"key": "b", "value": "2"}], results[0]
+        )
+        self.assertListEqual([{"key": "c", "value": "3"}], results[1])
+
+    def test_deep_update_dict(self) -> None:
+        dest = {"a": {"b": 1, "c": {"d": 2}}, "e": {"f": 3}, "g": None}
+        src = {"a": {"c": {"d": 4, "h": 5}}, "g": {"i": 6}}
+        result = deep_update_dict(src, dest)
+        self.assertDictEqual(
+            {"a": {"b": 1, "c": {"d": 4, "h": 5}}, "e": {"f": 3}, "g": {"i": 6}},
+            result,
+        )
+        # dest is not changed, and untouched branch is shared.
+        self.assertDictEqual({"d": 2}, dest["a"]["c"])
+        self.assertIs(dest["e"], result["e"])
+
+    def test_deep_update_dict_in_place(self) -> None:
+        dest = {"a": {"b": 1}}
+        result = deep_update_dict({"a": {"c": 2}}, dest, copy=False)
+        self.assertIs(dest, result)
+        self.assertDictEqual({"a": {"b": 1, "c": 2}}, dest)
+
+    def test_filter_ansi_escape(self) -> None:
+        self.assertEqual("red text", filter_ansi_escape("\x1B[31mred\x1B[0m text"))
+        self.assertEqual("no escape", filter_ansi_escape("no escape"))
+
+    def test_parse_version(self) -> None:
+        self.assertEqual("1.2.3", str(parse_version("1.2.3")))
+        self.assertEqual("1.2.3", str(parse_version("01.02.3")))
+        self.assertEqual("18.4.0", str(parse_version("18.04")))
+        self.assertEqual("1.2.3-rc1", str(parse_version("1.2.3-rc1")))
+        self.assertEqual("5.4.0-1043+azure", str(parse_version("v5.4.0-1043+azure")))
+
+    def test_parse_version_invalid(self) -> None:
+        for version in ["1", "1..2", "-.1", "a.b.c", "1" * 5000 + "x"]:
+            with self.assertRaises(LisaException):
+                parse_version(version)
+
+    def test_is_valid_url(self) -> None:
+        self.assertTrue(is_valid_url("https://example.com/a?b=1"))
+        self.assertTrue(is_valid_url("http://10.0.0.1:8080/", raise_error=False))
+        self.assertFalse(is_valid_url("example.com", raise_error=False))
+        # long invalid input should fail quickly
+        self.assertFalse(is_valid_url("http://" + "a-" * 3000 + "!", raise_error=False))
+
+    def test_find_with_str_patterns(self) -> None:
+        self.assertListEqual(
+            [["1", "2"]], find_patterns_in_lines("a=1\nb=2", [r"=(\d)"])
+        )
+        self.assertEqual("2", get_matched_str("a=1\nb=2", r"=(\d)", False))
+        self.assertListEqual(
+            [{"key": "a"}], find_patterns_groups_in_lines("a=1", [r"(?P<key>\w)="])[0]
+        )
+
+    def test_fields_to_dict(self) -> None:
+        src = SimpleNamespace(a=1, b=None, c="c")
+        self.assertDictEqual({"a": 1, "c": "c"}, fields_to_dict(src, ["a", "b", "c"]))
+        self.assertDictEqual({"b": None}, fields_to_dict(src, ["b"], True))
+
+    def test_set_filtered_fields(self) -> None:
+        dest = SimpleNamespace(a=0, b=0)
+        set_filtered_fields(SimpleNamespace(a=1, b=None), dest, ["a", "b"])
+        self.assertEqual(1, dest.a)
+        self.assertEqual(0, dest.b)
+        with self.assertRaises(LisaException):
+            set_filtered_fields(SimpleNamespace(a=1), dest, ["a", "x"])
+
+    def test_get_datetime_path(self) -> None:
+        current = datetime(2021, 12, 31, 23, 59, 59, 999999)
+        self.assertEqual("20211231", get_date_str(current))
+        self.assertEqual("20211231-235959-999", get_datetime_path(current))
+
+    def test_run_in_parallel(self) -> None:
+        results = run_in_parallel([partial(pow, x, 2) for x in range(5)])
+        self.assertListEqual([0, 1, 4, 9, 16], results)
+        self.assertListEqual([], run_in_parallel([]))
+
+    def test_run_in_parallel_error(self) -> None:
+        finished = []
+        with self.assertRaises(ZeroDivisionError):
+            run_in_parallel(
+                [partial(divmod, 1, 0), partial(finished.append, 1)], max_workers=1
+            )
+        # other tasks are finished, before the error is raised.
+        self.assertListEqual([1], finished)